@@ -9,15 +9,15 @@
  * Integration Flow:
  * 1. Receive user profile + query from frontend
  * 2. Validate input data
- * 3. Spawn Python predict.py process via child_process
- * 4. Pass JSON input via stdin
- * 5. Parse JSON output from stdout
+ * 3. Send request to a persistent Python predict.py worker (spawned once via child_process)
+ * 4. Pass JSON input via stdin (one request per line)
+ * 5. Parse JSON output from stdout (one response per line)
  * 6. (Optional) Feed top recommendations to Ollama for natural language response
  * 7. Return combined response to frontend
  */
 
 import { Request, Response } from 'express';
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 import { fileURLToPath } from 'url';
 import { dirname } from 'path';
@@ -87,70 +87,148 @@ interface MLResponse {
 }
 
 /**
- * Execute Python ML prediction script
- * 
- * @param input - User profile and query
- * @returns Promise with ML predictions
+ * Pending prediction waiting for its line on the worker's stdout
  */
-async function runMLPrediction(input: RecommendationRequest): Promise<MLResponse> {
-  return new Promise((resolve, reject) => {
-    // Spawn Python process
-    const python = spawn('python3', [PREDICT_SCRIPT], {
-      cwd: ML_DIR,
-    });
+interface PendingPrediction {
+  resolve: (result: MLResponse) => void;
+  reject: (error: Error) => void;
+  timer: NodeJS.Timeout;
+}
+
+/**
+ * Persistent Python worker
+ * The worker answers requests strictly in order, so each worker keeps its own
+ * FIFO queue of pending callbacks (a respawned worker starts with an empty one)
+ */
+interface MLWorker {
+  process: ChildProcessWithoutNullStreams;
+  send: (input: RecommendationRequest) => Promise<MLResponse>;
+}
 
-    let stdout = '';
-    let stderr = '';
+let mlWorker: MLWorker | null = null;
+const MAX_WORKER_STDERR = 10000;
+// A request not answered in time means the worker is stuck: it is killed so
+// later requests don't queue behind it forever (the next request respawns it)
+const ML_REQUEST_TIMEOUT_MS = 30000;
 
-    // Collect stdout (JSON response)
-    python.stdout.on('data', (data) => {
-      stdout += data.toString();
+/**
+ * Start (or reuse) the long-lived predict.py worker
+ * Models are loaded once by the worker instead of once per request
+ */
+function getMLWorker(): MLWorker {
+  if (mlWorker) {
+    return mlWorker;
+  }
+
+  const python = spawn('python3', [PREDICT_SCRIPT, '--worker'], {
+    cwd: ML_DIR,
+  });
+  const pendingPredictions: PendingPrediction[] = [];
+  let workerStdout = '';
+  let workerStderr = '';
+
+  // Retire this worker: later requests spawn a new one, and everything still
+  // queued on this one is rejected
+  const failWorker = (error: Error) => {
+    if (mlWorker?.process === python) {
+      mlWorker = null;
+    }
+    const pending = pendingPredictions.splice(0);
+    pending.forEach(({ reject, timer }) => {
+      clearTimeout(timer);
+      reject(error);
     });
+  };
 
-    // Collect stderr (errors)
-    python.stderr.on('data', (data) => {
-      stderr += data.toString();
+  const send = (input: RecommendationRequest) =>
+    new Promise<MLResponse>((resolve, reject) => {
+      const timer = setTimeout(() => {
+        console.error('[RecController] ML prediction timed out, restarting Python worker');
+        failWorker(new Error(`ML prediction timed out after ${ML_REQUEST_TIMEOUT_MS}ms`));
+        python.kill();
+      }, ML_REQUEST_TIMEOUT_MS);
+      pendingPredictions.push({ resolve, reject, timer });
+
+      // Send one JSON request per line to the worker via stdin
+      // (asynchronous write failures arrive through stdin's 'error' event)
+      try {
+        python.stdin.write(JSON.stringify(input) + '\n');
+      } catch (error) {
+        failWorker(new Error('Failed to send data to ML prediction script'));
+        python.kill();
+      }
     });
 
-    // Handle process completion
-    python.on('close', (code) => {
-      if (code !== 0) {
-        console.error('[RecController] Python script error:', stderr);
-        
-        // Try to parse error JSON from stderr
-        try {
-          const errorJson = JSON.parse(stderr);
-          reject(new Error(errorJson.error || 'ML prediction failed'));
-        } catch {
-          reject(new Error(`ML prediction failed with code ${code}: ${stderr}`));
-        }
-        return;
+  // Each complete stdout line is the response to the oldest pending request
+  python.stdout.on('data', (data) => {
+    workerStdout += data.toString();
+
+    let newlineIndex: number;
+    while ((newlineIndex = workerStdout.indexOf('\n')) !== -1) {
+      const line = workerStdout.slice(0, newlineIndex).trim();
+      workerStdout = workerStdout.slice(newlineIndex + 1);
+      if (!line) continue;
+
+      const pending = pendingPredictions.shift();
+      if (!pending) {
+        console.error('[RecController] Unexpected ML worker output:', line);
+        continue;
       }
+      clearTimeout(pending.timer);
 
-      // Parse JSON response
       try {
-        const result: MLResponse = JSON.parse(stdout);
-        resolve(result);
+        const result: MLResponse = JSON.parse(line);
+        if (result.error) {
+          pending.reject(new Error(result.error));
+        } else {
+          pending.resolve(result);
+        }
       } catch (error) {
-        console.error('[RecController] Failed to parse ML output:', stdout);
-        reject(new Error('Failed to parse ML prediction response'));
+        console.error('[RecController] Failed to parse ML output:', line);
+        pending.reject(new Error('Failed to parse ML prediction response'));
       }
-    });
+    }
+  });
 
-    // Handle process errors
-    python.on('error', (error) => {
-      console.error('[RecController] Failed to spawn Python process:', error);
-      reject(new Error(`Failed to run ML prediction: ${error.message}`));
-    });
+  // Collect stderr (errors, Python warnings) for diagnostics if the worker dies
+  // Only the tail is kept so a long-lived worker cannot grow this without bound
+  python.stderr.on('data', (data) => {
+    workerStderr = (workerStderr + data.toString()).slice(-MAX_WORKER_STDERR);
+  });
+
+  // Writing to a worker that already died (EPIPE) is reported here, possibly
+  // before 'close'; without a listener the stream error would crash the server
+  python.stdin.on('error', (error) => {
+    console.error('[RecController] Failed to write to Python worker:', error);
+    failWorker(new Error(`Failed to send data to ML prediction script: ${error.message}`));
+  });
 
-    // Send input data to Python via stdin
-    try {
-      python.stdin.write(JSON.stringify(input));
-      python.stdin.end();
-    } catch (error) {
-      reject(new Error('Failed to send data to ML prediction script'));
+  // Worker exited: fail everything in flight, next request respawns it
+  python.on('close', (code) => {
+    if (pendingPredictions.length > 0) {
+      console.error('[RecController] Python worker exited:', workerStderr);
     }
+    failWorker(new Error(`ML prediction failed with code ${code}: ${workerStderr}`));
   });
+
+  // Handle process errors
+  python.on('error', (error) => {
+    console.error('[RecController] Failed to spawn Python process:', error);
+    failWorker(new Error(`Failed to run ML prediction: ${error.message}`));
+  });
+
+  mlWorker = { process: python, send };
+  return mlWorker;
+}
+
+/**
+ * Execute ML prediction on the persistent Python worker
+ * 
+ * @param input - User profile and query
+ * @returns Promise with ML predictions
+ */
+async function runMLPrediction(input: RecommendationRequest): Promise<MLResponse> {
+  return getMLWorker().send(input);
 }
 
 /**
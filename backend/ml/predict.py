@@ -10,59 +10,252 @@ Output: JSON with ranked meal recommendations and probabilities
 Integration:
 Called via child_process.spawn() from /backend/controllers/recController.ts
 Communicates via stdin/stdout JSON protocol
+Run with --worker to keep models loaded and serve newline-delimited JSON requests
 """
 
 import sys
 import json
+import orjson
 import pandas as pd
 import numpy as np
 import joblib
 from pathlib import Path
-import warnings
-warnings.filterwarnings('ignore')
+
+# Copy-on-Write: column selections share buffers until written instead of
+# copying defensively (always enabled from pandas 3, where the option is deprecated)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
 
 # Define paths
 BASE_DIR = Path(__file__).parent.parent
 ML_DIR = BASE_DIR / 'ml'
 DATA_DIR = BASE_DIR / 'data'
 
+# Files whose modification times invalidate the in-process artifact cache
+ARTIFACT_FILES = [
+    ML_DIR / 'rf_model.pkl',
+    ML_DIR / 'preprocessor.pkl',
+    ML_DIR / 'feature_selector.pkl',
+    ML_DIR / 'feature_names.json',
+    ML_DIR / 'processed_data.parquet',
+    DATA_DIR / 'usda-foods.csv',
+]
+
+# Model input columns (must match preprocess.py)
+NUMERICAL_FEATURES = [
+    'calories', 'protein_g', 'fat_g', 'carbs_g', 'fiber_g', 'sugars_g',
+    'sodium_mg', 'vitamin_a_iu', 'vitamin_c_mg', 'calcium_mg', 'iron_mg',
+    'potassium_mg', 'magnesium_mg', 'zinc_mg', 'phosphorus_mg',
+    'cost_per_serving', 'nutrient_density', 'sugar_to_carb_ratio'
+]
+CATEGORICAL_FEATURES = ['food_category']
+BINARY_FEATURES = ['is_glutenfree', 'is_nutfree', 'is_vegan']
+
+# Column dtypes used when parsing the food database: the pipeline needs ~3
+# significant digits, so nutrients are float32 and dietary flags uint8
+FOOD_DTYPES = {col: np.float32 for col in NUMERICAL_FEATURES}
+FOOD_DTYPES.update({col: np.uint8 for col in BINARY_FEATURES})
+
+# Dietary flag column -> normalized restriction names that require it
+DIETARY_FLAGS = [
+    ('is_vegan', ('vegan',)),
+    ('is_glutenfree', ('gluten-free',)),
+    ('is_nutfree', ('nut-allergy', 'nut-free')),
+]
+
+# Goal -> ([(column, comparison, threshold), ...], boost)
+# Foods meeting every condition get their fit probability multiplied by boost
+GOAL_BOOSTS = {
+    # Boost foods with calories < 300 and protein > 15g
+    'Weight Loss': ([('calories', np.less, 300), ('protein_g', np.greater, 15)], 1.2),
+    # Boost high-protein foods (>20g protein)
+    'Muscle Gain': ([('protein_g', np.greater, 20)], 1.3),
+    # Boost low-sodium, high-fiber foods
+    'Heart Health': ([('sodium_mg', np.less, 500), ('fiber_g', np.greater, 5)], 1.2),
+}
+
+# Loaded artifacts, kept for the lifetime of the process (see get_artifacts)
+_artifact_cache = {'key': None, 'artifacts': None}
+
 def load_models():
     """
     Load trained model, preprocessor, and feature selector
     Returns: model, preprocessor, feature_selector, feature_names
     """
     try:
-        model = joblib.load(ML_DIR / 'rf_model.pkl')
-        preprocessor = joblib.load(ML_DIR / 'preprocessor.pkl')
-        feature_selector = joblib.load(ML_DIR / 'feature_selector.pkl')
+        # mmap_mode='r': numpy buffers (tree arrays etc.) are paged in from the
+        # OS page cache instead of being copied into fresh allocations
+        model = joblib.load(ML_DIR / 'rf_model.pkl', mmap_mode='r')
+        # Evaluate trees on all cores (pickled forests keep the training-time
+        # n_jobs; boosted models have no n_jobs and use OpenMP threads already)
+        if hasattr(model, 'n_jobs'):
+            model.n_jobs = -1
+        preprocessor = joblib.load(ML_DIR / 'preprocessor.pkl', mmap_mode='r')
+        feature_selector = joblib.load(ML_DIR / 'feature_selector.pkl', mmap_mode='r')
         
         with open(ML_DIR / 'feature_names.json', 'r') as f:
             feature_info = json.load(f)
         
         return model, preprocessor, feature_selector, feature_info
     except FileNotFoundError as e:
-        print(json.dumps({'error': f'Model files not found. Run train.py first. {str(e)}'}), file=sys.stderr)
-        sys.exit(1)
+        raise FileNotFoundError(f'Model files not found. Run train.py first. {str(e)}')
 
 def load_food_database():
     """
     Load complete food database for ranking
+    Read from Parquet (falling back to the raw CSV via the PyArrow engine)
+    and cast to the FOOD_DTYPES schema
+    Rows are sorted by cost_per_serving, so the affordable foods for any
+    budget form a prefix (see filter_by_user_constraints)
     Returns: DataFrame with all food items and their features
     """
     try:
         # Load processed data (includes all foods with computed features)
-        df = pd.read_csv(ML_DIR / 'processed_data.csv')
-        return df
+        df = pd.read_parquet(ML_DIR / 'processed_data.parquet', engine='pyarrow')
     except FileNotFoundError:
         # Fallback to raw USDA data
         try:
-            df = pd.read_csv(DATA_DIR / 'usda-foods.csv')
-            return df
+            df = pd.read_csv(DATA_DIR / 'usda-foods.csv', engine='pyarrow')
         except FileNotFoundError as e:
-            print(json.dumps({'error': f'Food database not found: {str(e)}'}), file=sys.stderr)
-            sys.exit(1)
+            raise FileNotFoundError(f'Food database not found: {str(e)}')
+    
+    # Cast only the columns present: the raw CSV lacks the derived features,
+    # and pandas < 3 rejects dtype mappings that name missing columns
+    df = df.astype({col: dtype for col, dtype in FOOD_DTYPES.items() if col in df.columns})
+    
+    if 'cost_per_serving' in df.columns:
+        df = df.sort_values('cost_per_serving', kind='stable', ignore_index=True)
+    
+    return df
+
+def build_feature_matrix(df, preprocessor, selected_idx):
+    """
+    Transform every food in the database into model inputs once
+    
+    Why: The food database is static between model retrains, so running the
+    preprocessor per request repeated the same work.
+    
+    Returns: Selected-feature matrix with one row per food (CSR if sparse)
+    """
+    # Select the feature columns once (column selection already returns a new
+    # frame, so no separate defensive copy of the whole database is needed)
+    feature_columns = NUMERICAL_FEATURES + CATEGORICAL_FEATURES + BINARY_FEATURES
+    X = df[[col for col in feature_columns if col in df.columns]]
+    
+    # Ensure all required columns exist (fill missing with defaults)
+    for col in NUMERICAL_FEATURES:
+        if col not in X.columns:
+            if col == 'nutrient_density':
+                X[col] = (X.get('protein_g', 0) + X.get('fiber_g', 0)) / (X.get('calories', 1) + 1)
+            elif col == 'sugar_to_carb_ratio':
+                X[col] = X.get('sugars_g', 0) / (X.get('carbs_g', 1) + 1)
+            else:
+                X[col] = 0
+    
+    for col in CATEGORICAL_FEATURES:
+        if col not in X.columns:
+            X[col] = 'unknown'
+    
+    for col in BINARY_FEATURES:
+        if col not in X.columns:
+            X[col] = 0
+    
+    # Apply preprocessing pipeline to the feature columns
+    # (HistGradientBoosting validates X as float64, so keep the transformer's
+    # float64 output rather than downcasting for the model to upcast again)
+    X_transformed = preprocessor.transform(X[feature_columns])
+    if hasattr(X_transformed, 'tocsr'):
+        X_transformed = X_transformed.tocsr()
+    X_transformed = X_transformed.astype(np.float64, copy=False)
+    
+    # Apply feature selection (plain column mask)
+    return X_transformed[:, selected_idx]
+
+def predict_food_probabilities(model, df, preprocessor, selected_idx):
+    """
+    Predict the fit probability of every food in the database once
+    
+    Why: A food's probability depends only on its own features, not on the
+    user, so requests just gather these values for their eligible foods
+    and the boosted trees are never evaluated on the request path.
+    
+    Returns: float32 array of P(fit=1), one entry per food row
+    """
+    X_selected_all = build_feature_matrix(df, preprocessor, selected_idx)
+    return model.predict_proba(X_selected_all)[:, 1].astype(np.float32)
+
+def get_artifacts():
+    """
+    Return loaded models and food database, loading them at most once per process
+    
+    Why: Unpickling the model and parsing the food CSV dominates request latency.
+    The cache is keyed by file modification times, so a long-running worker
+    picks up freshly trained artifacts without a restart.
+    
+    Returns: Dict with model, preprocessor, feature_selector (and its selected
+             column indices), feature_info, food_db, its columnar arrays,
+             per-goal boost masks and per-food fit probabilities (probs_all)
+    """
+    key = tuple(p.stat().st_mtime_ns if p.exists() else None for p in ARTIFACT_FILES)
+    if _artifact_cache['key'] != key:
+        model, preprocessor, feature_selector, feature_info = load_models()
+        food_db = load_food_database()
+        food_cols = build_food_columns(food_db)
+        selected_idx = feature_selector.get_support(indices=True)
+        _artifact_cache['artifacts'] = {
+            'model': model,
+            'preprocessor': preprocessor,
+            'feature_selector': feature_selector,
+            'selected_idx': selected_idx,
+            'feature_info': feature_info,
+            'food_db': food_db,
+            'food_cols': food_cols,
+            'goal_masks': build_goal_masks(food_cols),
+            'probs_all': predict_food_probabilities(model, food_db, preprocessor, selected_idx),
+        }
+        _artifact_cache['key'] = key
+    return _artifact_cache['artifacts']
+
+def build_food_columns(df):
+    """
+    Convert the food database into a columnar dict of typed NumPy arrays
+    
+    Why: Filtering and ranking only touch a handful of columns. Contiguous
+    arrays built once at load time let each request combine constraints in a
+    single boolean mask instead of copying the whole DataFrame per filter.
+    
+    Dtypes: nutrients/cost as float32, dietary flags as uint8 (plus a packed
+    dietary_bits byte per food), description/food_category as object arrays
+    for the response payload
+    Flag columns missing from the source data are left out, so the matching
+    restriction is not applied (same as before when the column was absent).
+    
+    Returns: Dict mapping column name -> np.ndarray (one entry per food row)
+    """
+    cols = {}
+    for col in ['calories', 'protein_g', 'fat_g', 'carbs_g', 'fiber_g', 'sugars_g',
+                'sodium_mg', 'cost_per_serving']:
+        if col in df.columns:
+            cols[col] = df[col].to_numpy(dtype=np.float32)
+    
+    for col in ['is_vegan', 'is_glutenfree', 'is_nutfree']:
+        if col in df.columns:
+            cols[col] = df[col].to_numpy(dtype=np.uint8)
+    
+    # Dietary flags packed into one byte per food (bit i <-> DIETARY_FLAGS[i])
+    dietary_bits = np.zeros(len(df), dtype=np.uint8)
+    for bit, (col, _) in enumerate(DIETARY_FLAGS):
+        if col in cols:
+            dietary_bits |= (cols[col] == 1).astype(np.uint8) << bit
+    cols['dietary_bits'] = dietary_bits
+    
+    for col in ['description', 'food_category']:
+        if col in df.columns:
+            cols[col] = df[col].to_numpy(dtype=object)
+    
+    return cols
 
-def filter_by_user_constraints(df, user_profile):
+def filter_by_user_constraints(cols, user_profile):
     """
     Filter foods based on user's dietary restrictions and preferences
     
@@ -71,35 +264,59 @@ def filter_by_user_constraints(df, user_profile):
     - weeklyBudget: max cost per serving
     - favoriteCuisines: ['Italian', 'Asian', etc.] (optional filtering)
     
-    Returns: Filtered DataFrame
-    """
-    filtered_df = df.copy()
+    The budget is applied first: foods are sorted by cost at load time, so
+    affordable foods are a prefix found by binary search, and dietary
+    constraints are only checked on that prefix.
     
+    Returns: Integer indices of eligible foods (positions in the food database)
+    """
     # Extract user constraints
-    restrictions = user_profile.get('dietaryRestrictions', [])
+    # Restrictions are normalized once ('Gluten Free', 'gluten_free' -> 'gluten-free')
+    restrictions = {
+        r.lower().replace(' ', '-').replace('_', '-')
+        for r in user_profile.get('dietaryRestrictions', [])
+    }
     budget = user_profile.get('weeklyBudget', 100)  # Default $100/week
     max_cost_per_serving = budget / 21  # Assume 3 meals/day * 7 days
     
-    # Filter by dietary restrictions
-    if 'Vegan' in restrictions or 'vegan' in restrictions:
-        if 'is_vegan' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['is_vegan'] == 1]
+    # Filter by budget (cost-sorted, so this is the affordable prefix length)
+    if 'cost_per_serving' in cols:
+        n_affordable = int(np.searchsorted(cols['cost_per_serving'], max_cost_per_serving, side='right'))
+    else:
+        n_affordable = len(cols['dietary_bits'])
     
-    if 'Gluten Free' in restrictions or 'gluten-free' in restrictions:
-        if 'is_glutenfree' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['is_glutenfree'] == 1]
+    if n_affordable == 0:
+        return np.empty(0, dtype=np.intp)
     
-    if 'Nut Allergy' in restrictions or 'nut-free' in restrictions:
-        if 'is_nutfree' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['is_nutfree'] == 1]
+    # Filter by dietary restrictions: every required flag is checked in a
+    # single pass over the packed dietary bits of the affordable foods
+    required_bits = 0
+    for bit, (col, names) in enumerate(DIETARY_FLAGS):
+        if col in cols and not restrictions.isdisjoint(names):
+            required_bits |= 1 << bit
+    
+    affordable_bits = cols['dietary_bits'][:n_affordable]
+    return np.nonzero((affordable_bits & required_bits) == required_bits)[0]
+
+def build_goal_masks(cols):
+    """
+    Evaluate every GOAL_BOOSTS rule once over the whole food database
     
-    # Filter by budget
-    if 'cost_per_serving' in filtered_df.columns:
-        filtered_df = filtered_df[filtered_df['cost_per_serving'] <= max_cost_per_serving]
+    Why: Goal thresholds are constant and the food database is static between
+    loads, so per-request goal adjustment reduces to gathering these masks.
     
-    return filtered_df
+    Returns: Dict mapping goal -> boolean np.ndarray (one entry per food row)
+    """
+    n_foods = len(next(iter(cols.values()))) if cols else 0
+    goal_masks = {}
+    for goal, (conditions, _) in GOAL_BOOSTS.items():
+        mask = np.ones(n_foods, dtype=bool)
+        for col, op, threshold in conditions:
+            mask &= op(cols[col], threshold)
+        goal_masks[goal] = mask
+    return goal_masks
 
-def adjust_for_goals(probs, df, user_profile):
+def adjust_for_goals(probs, goal_masks, eligible_idx, user_profile):
     """
     Adjust prediction probabilities based on user's primary goal
     
@@ -109,28 +326,29 @@ def adjust_for_goals(probs, df, user_profile):
     - Heart Health: Boost low-sodium, high-fiber foods
     - Budget: Already filtered by cost, boost nutrient density
     
+    Boost factors come from GOAL_BOOSTS and matching foods from the
+    precomputed goal masks; the boost and the clip to 1.0 are applied in
+    place on the masked entries only.
+    
+    Args:
+        probs: Probabilities for the eligible foods
+        goal_masks: Per-goal food masks (see build_goal_masks)
+        eligible_idx: Positions of the eligible foods in the food database
+    
     Returns: Adjusted probabilities
     """
     goal = user_profile.get('primaryGoal', '')
     adjusted_probs = probs.copy()
     
-    if goal == 'Weight Loss':
-        # Boost foods with calories < 300 and protein > 15g
-        low_cal_mask = (df['calories'] < 300) & (df['protein_g'] > 15)
-        adjusted_probs[low_cal_mask] *= 1.2
+    if goal not in GOAL_BOOSTS:
+        return adjusted_probs
     
-    elif goal == 'Muscle Gain':
-        # Boost high-protein foods (>20g protein)
-        high_protein_mask = df['protein_g'] > 20
-        adjusted_probs[high_protein_mask] *= 1.3
+    _, boost = GOAL_BOOSTS[goal]
+    mask = goal_masks[goal][eligible_idx]
     
-    elif goal == 'Heart Health':
-        # Boost low-sodium, high-fiber foods
-        heart_healthy_mask = (df['sodium_mg'] < 500) & (df['fiber_g'] > 5)
-        adjusted_probs[heart_healthy_mask] *= 1.2
-    
-    # Normalize probabilities to [0, 1]
-    adjusted_probs = np.clip(adjusted_probs, 0, 1)
+    # Boost matching foods, keeping probabilities within [0, 1]
+    np.multiply(adjusted_probs, boost, out=adjusted_probs, where=mask)
+    np.minimum(adjusted_probs, 1.0, out=adjusted_probs)
     
     return adjusted_probs
 
@@ -139,10 +357,10 @@ def predict_top_meals(user_input, top_k=5):
     Main prediction pipeline
     
     Steps:
-    1. Load trained model and food database
+    1. Fetch cached model and food database (loaded once per process)
     2. Filter foods by user constraints (allergies, budget)
-    3. Prepare features for prediction
-    4. Predict fit probabilities for all eligible foods
+    3. Look up fit probabilities for all eligible foods
+       (predicted once per food at load time; they do not depend on the user)
     5. Adjust probabilities based on user goals
     6. Rank and return top-k recommendations
     
@@ -153,114 +371,91 @@ def predict_top_meals(user_input, top_k=5):
     Returns:
         Dict with ranked meals, probabilities, and reasons
     """
-    # Load artifacts
-    model, preprocessor, feature_selector, feature_info = load_models()
-    food_db = load_food_database()
+    # Load artifacts (cached across requests in worker mode)
+    artifacts = get_artifacts()
     
     # Extract user data
     user_profile = user_input.get('userProfile', {})
     query = user_input.get('query', '')
     
     # Filter foods by user constraints
-    eligible_foods = filter_by_user_constraints(food_db, user_profile)
+    eligible_idx = filter_by_user_constraints(artifacts['food_cols'], user_profile)
     
-    if len(eligible_foods) == 0:
+    if len(eligible_idx) == 0:
         return {
             'recommendations': [],
             'message': 'No foods match your dietary restrictions and budget. Try relaxing some constraints.'
         }
     
-    # Prepare features for prediction
-    numerical_features = [
-        'calories', 'protein_g', 'fat_g', 'carbs_g', 'fiber_g', 'sugars_g',
-        'sodium_mg', 'vitamin_a_iu', 'vitamin_c_mg', 'calcium_mg', 'iron_mg',
-        'potassium_mg', 'magnesium_mg', 'zinc_mg', 'phosphorus_mg',
-        'cost_per_serving', 'nutrient_density', 'sugar_to_carb_ratio'
-    ]
-    categorical_features = ['food_category']
-    binary_features = ['is_glutenfree', 'is_nutfree', 'is_vegan']
-    
-    # Ensure all required columns exist (fill missing with defaults)
-    for col in numerical_features:
-        if col not in eligible_foods.columns:
-            if col == 'nutrient_density':
-                eligible_foods[col] = (eligible_foods.get('protein_g', 0) + eligible_foods.get('fiber_g', 0)) / (eligible_foods.get('calories', 1) + 1)
-            elif col == 'sugar_to_carb_ratio':
-                eligible_foods[col] = eligible_foods.get('sugars_g', 0) / (eligible_foods.get('carbs_g', 1) + 1)
-            else:
-                eligible_foods[col] = 0
-    
-    for col in categorical_features:
-        if col not in eligible_foods.columns:
-            eligible_foods[col] = 'unknown'
-    
-    for col in binary_features:
-        if col not in eligible_foods.columns:
-            eligible_foods[col] = 0
-    
-    # Select feature columns
-    X = eligible_foods[numerical_features + categorical_features + binary_features]
-    
-    # Apply preprocessing pipeline
-    X_transformed = preprocessor.transform(X)
-    
-    # Handle non-negative requirement for chi2
-    X_nonneg = X_transformed - X_transformed.min() + 1e-9
-    
-    # Apply feature selection
-    X_selected = feature_selector.transform(X_nonneg)
-    
-    # Predict probabilities
-    probs = model.predict_proba(X_selected)[:, 1]  # Probability of fit=1
+    # Gather precomputed fit probabilities for the eligible foods
+    probs = artifacts['probs_all'][eligible_idx]
     
     # Adjust for user goals
-    probs = adjust_for_goals(probs, eligible_foods, user_profile)
-    
-    # Rank by probability (descending)
-    top_indices = np.argsort(probs)[::-1][:top_k]
+    probs = adjust_for_goals(probs, artifacts['goal_masks'], eligible_idx, user_profile)
+    
+    # Rank by probability (descending): partial select top-k, then sort only those k
+    k = min(top_k, probs.size)
+    top_indices = np.argpartition(-probs, k - 1)[:k]
+    top_indices = top_indices[np.argsort(-probs[top_indices], kind='stable')]
+    
+    # Gather the top-k foods once from the columnar arrays (no per-row pandas access)
+    cols = artifacts['food_cols']
+    top_rows = eligible_idx[top_indices]
+    top = {col: values[top_rows] for col, values in cols.items()}
+    top_probs = probs[top_indices]
+    no_flag = np.zeros(k, dtype=np.uint8)
+    
+    # Reason and dietary conditions, evaluated for all k foods at once
+    high_protein = top['protein_g'] > 15
+    high_fiber = top['fiber_g'] > 5
+    low_calorie = top['calories'] < 200
+    low_sugar = top['sugars_g'] < 5
+    budget_friendly = top['cost_per_serving'] < 2
+    is_vegan = top.get('is_vegan', no_flag) == 1
+    is_glutenfree = top.get('is_glutenfree', no_flag) == 1
+    is_nutfree = top.get('is_nutfree', no_flag) == 1
     
     # Build recommendations
     recommendations = []
-    for idx in top_indices:
-        food = eligible_foods.iloc[idx]
-        prob = probs[idx]
+    for i in range(k):
+        prob = top_probs[i]
         
         # Generate reason based on features
         reasons = []
-        if food['protein_g'] > 15:
-            reasons.append(f"High protein ({food['protein_g']:.1f}g)")
-        if food['fiber_g'] > 5:
-            reasons.append(f"High fiber ({food['fiber_g']:.1f}g)")
-        if food['calories'] < 200:
-            reasons.append(f"Low calorie ({food['calories']:.0f} kcal)")
-        if food['sugars_g'] < 5:
-            reasons.append(f"Low sugar ({food['sugars_g']:.1f}g)")
-        if food['cost_per_serving'] < 2:
-            reasons.append(f"Budget-friendly (${food['cost_per_serving']:.2f})")
+        if high_protein[i]:
+            reasons.append(f"High protein ({top['protein_g'][i]:.1f}g)")
+        if high_fiber[i]:
+            reasons.append(f"High fiber ({top['fiber_g'][i]:.1f}g)")
+        if low_calorie[i]:
+            reasons.append(f"Low calorie ({top['calories'][i]:.0f} kcal)")
+        if low_sugar[i]:
+            reasons.append(f"Low sugar ({top['sugars_g'][i]:.1f}g)")
+        if budget_friendly[i]:
+            reasons.append(f"Budget-friendly (${top['cost_per_serving'][i]:.2f})")
         
         # Dietary flags
         dietary = []
-        if food.get('is_vegan', 0) == 1:
+        if is_vegan[i]:
             dietary.append('Vegan')
-        if food.get('is_glutenfree', 0) == 1:
+        if is_glutenfree[i]:
             dietary.append('Gluten-free')
-        if food.get('is_nutfree', 0) == 1:
+        if is_nutfree[i]:
             dietary.append('Nut-free')
         
         recommendation = {
-            'name': food['description'],
-            'category': food.get('food_category', 'Unknown'),
-            'fit_score': float(prob),
+            'name': top['description'][i],
+            'category': top['food_category'][i] if 'food_category' in top else 'Unknown',
+            'fit_score': prob,
             'confidence': 'high' if prob > 0.8 else 'medium' if prob > 0.6 else 'moderate',
             'nutrition': {
-                'calories': float(food['calories']),
-                'protein': float(food['protein_g']),
-                'carbs': float(food['carbs_g']),
-                'fat': float(food['fat_g']),
-                'fiber': float(food['fiber_g']),
-                'sugars': float(food['sugars_g'])
+                'calories': top['calories'][i],
+                'protein': top['protein_g'][i],
+                'carbs': top['carbs_g'][i],
+                'fat': top['fat_g'][i],
+                'fiber': top['fiber_g'][i],
+                'sugars': top['sugars_g'][i]
             },
-            'cost': float(food['cost_per_serving']),
+            'cost': top['cost_per_serving'][i],
             'reasons': reasons,
             'dietary_info': dietary
         }
@@ -269,17 +464,56 @@ def predict_top_meals(user_input, top_k=5):
     return {
         'recommendations': recommendations,
         'query': query,
-        'total_eligible': len(eligible_foods),
+        'total_eligible': len(eligible_idx),
         'model_version': '1.0',
         'user_goal': user_profile.get('primaryGoal', 'General Health')
     }
 
+def write_json(result, option=0):
+    """
+    Write one JSON document (plus newline) to stdout and flush
+    
+    orjson serializes NumPy scalars natively, so recommendation fields are
+    emitted straight from the float32 arrays without float() coercion.
+    """
+    sys.stdout.buffer.write(orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY | option) + b'\n')
+    sys.stdout.flush()
+
+def run_worker():
+    """
+    Persistent worker loop for the TypeScript backend
+    
+    Reads one JSON request per line from stdin and writes exactly one JSON
+    response per line to stdout. Models stay loaded between requests, so only
+    the first request pays the artifact loading cost. Failures are reported
+    as {"error": ...} lines and the worker keeps serving.
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            user_input = json.loads(line)
+            result = predict_top_meals(user_input, top_k=user_input.get('top_k', 5))
+        except json.JSONDecodeError as e:
+            result = {'error': f'Invalid JSON input: {str(e)}'}
+        except Exception as e:
+            result = {'error': f'Prediction failed: {str(e)}'}
+        
+        try:
+            write_json(result)
+        except orjson.JSONEncodeError as e:
+            # e.g. an echoed request field orjson cannot encode (ints beyond
+            # 64 bits); the response line is still owed, so send an error
+            write_json({'error': f'Failed to serialize response: {str(e)}'})
+
 def main():
     """
     Main entry point for command-line prediction
     
     Usage:
-    1. From TypeScript: echo '{"userProfile": {...}, "query": "..."}' | python predict.py
+    1. From TypeScript: python predict.py --worker (one JSON request per line)
     2. From command line: python predict.py < input.json
     
     Input JSON format:
@@ -309,6 +543,10 @@ def main():
       ]
     }
     """
+    if '--worker' in sys.argv[1:]:
+        run_worker()
+        return
+    
     try:
         # Read input from stdin
         if sys.stdin.isatty():
@@ -337,7 +575,7 @@ def main():
         result = predict_top_meals(user_input, top_k=top_k)
         
         # Output JSON to stdout
-        print(json.dumps(result, indent=2))
+        write_json(result, orjson.OPT_INDENT_2)
         sys.exit(0)
         
     except json.JSONDecodeError as e:
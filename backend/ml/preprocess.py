@@ -13,28 +13,37 @@ This script:
 3. Handles missing values via median imputation
 4. Encodes categorical features (OneHot)
 5. Scales numerical features (StandardScaler)
-6. Applies feature selection (SelectKBest chi2)
+6. Applies feature selection (SelectKBest ANOVA F-test)
 7. Balances classes via SMOTE oversampling
 8. Splits data 80/20 stratified
 9. Saves preprocessor and processed data
+
+Usage:
+  python preprocess.py          # one run (n_synthetic=500, k=10), saves artifacts
+  python preprocess.py --grid   # compare (n_synthetic, k) combinations in
+                                # parallel via preprocess_grid(); nothing is saved
 """
 
 import pandas as pd
 import numpy as np
 import json
 import os
+import sys
 from pathlib import Path
 import joblib
-from sklearn.model_selection import train_test_split
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedShuffleSplit
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
-from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.feature_selection import SelectKBest, f_classif
+from sklearn.neighbors import NearestNeighbors
 from imblearn.over_sampling import SMOTE
 
 # Set random seed for reproducibility (as per research methodology)
+# Data generation draws from a np.random.Generator seeded with RANDOM_STATE
+# (created per preprocess_data() run and passed to the generators)
 RANDOM_STATE = 42
-np.random.seed(RANDOM_STATE)
 
 # Define paths
 BASE_DIR = Path(__file__).parent.parent
@@ -45,74 +54,102 @@ ML_DIR = BASE_DIR / 'ml'
 ML_DIR.mkdir(exist_ok=True)
 DATA_DIR.mkdir(exist_ok=True)
 
-def create_sample_usda_data():
+# On-disk cache for the fitted pipeline (see fit_feature_pipeline)
+# Bump PIPELINE_VERSION when the pipeline code changes to invalidate it
+PIPELINE_VERSION = 4
+memory = joblib.Memory(ML_DIR / '.cache', verbose=0)
+
+# Food categories (10 unique for categorical encoding)
+FOOD_CATEGORIES = np.array(['vegetables', 'fruits', 'grains', 'proteins', 'dairy',
+                            'nuts_seeds', 'legumes', 'beverages', 'oils', 'snacks'])
+
+# Category-specific nutritional profiles, one row per FOOD_CATEGORIES entry
+# (looked up by integer category id)
+#                            cal, prot,  fat, carb,  fib, sug
+CATEGORY_PROFILES = np.array([
+    [ 25,    2,  0.3,    5,  2.5,   2],   # vegetables
+    [ 60,  0.8,  0.2,   15,    2,  10],   # fruits
+    [120,    4,    1,   25,    3,   1],   # grains
+    [180,   25,    8,    0,    0,   0],   # proteins
+    [100,    8,    5,   12,    0,  10],   # dairy
+    [180,    6,   16,    6,    3,   1],   # nuts_seeds
+    [110,    8,  0.5,   20,    8,   2],   # legumes
+    [ 40,  0.5,    0,   10,    0,   9],   # beverages
+    [120,    0,   14,    0,    0,   0],   # oils
+    [150,    3,    8,   18,    1,   8],   # snacks
+], dtype=np.float32)
+
+def draw_uniform_columns(rng, n, ranges):
+    """
+    Draw n float32 values per column, uniform within each column's bounds
+    
+    Why: One (n, k) draw scaled in place by the bounds replaces k separate
+    rng.uniform calls; columns come back already in their final dtype
+    
+    Args:
+        rng: np.random.Generator used for all random draws
+        n: Number of rows
+        ranges: Column -> (low, high)
+    
+    Returns: dict of column -> float32 ndarray (views of one buffer)
+    """
+    lows, highs = np.array(list(ranges.values()), dtype=np.float32).T
+    values = rng.random((n, len(ranges)), dtype=np.float32)
+    values *= highs - lows
+    values += lows
+    return dict(zip(ranges.keys(), values.T))
+
+def create_sample_usda_data(rng):
     """
     Create sample USDA nutritional database
     In production, this would be replaced with actual USDA FoodData Central data
     Format: 288 foundation foods with nutritional breakdown
+    
+    Args:
+        rng: np.random.Generator used for all random draws
     """
     print("[Preprocess] Creating sample USDA dataset...")
     
-    # Food categories (10 unique for categorical encoding)
-    categories = ['vegetables', 'fruits', 'grains', 'proteins', 'dairy', 
-                  'nuts_seeds', 'legumes', 'beverages', 'oils', 'snacks']
-    
-    # Generate 288 base foods (realistic nutritional profiles)
-    foods = []
-    for i in range(288):
-        cat = np.random.choice(categories)
-        
-        # Category-specific nutritional profiles
-        if cat == 'vegetables':
-            cal, prot, fat, carb, fib, sug = 25, 2, 0.3, 5, 2.5, 2
-        elif cat == 'fruits':
-            cal, prot, fat, carb, fib, sug = 60, 0.8, 0.2, 15, 2, 10
-        elif cat == 'grains':
-            cal, prot, fat, carb, fib, sug = 120, 4, 1, 25, 3, 1
-        elif cat == 'proteins':
-            cal, prot, fat, carb, fib, sug = 180, 25, 8, 0, 0, 0
-        elif cat == 'dairy':
-            cal, prot, fat, carb, fib, sug = 100, 8, 5, 12, 0, 10
-        elif cat == 'nuts_seeds':
-            cal, prot, fat, carb, fib, sug = 180, 6, 16, 6, 3, 1
-        elif cat == 'legumes':
-            cal, prot, fat, carb, fib, sug = 110, 8, 0.5, 20, 8, 2
-        elif cat == 'beverages':
-            cal, prot, fat, carb, fib, sug = 40, 0.5, 0, 10, 0, 9
-        elif cat == 'oils':
-            cal, prot, fat, carb, fib, sug = 120, 0, 14, 0, 0, 0
-        else:  # snacks
-            cal, prot, fat, carb, fib, sug = 150, 3, 8, 18, 1, 8
-        
-        # Add variance (±20% for realism)
-        food = {
-            'fdc_id': 100000 + i,
-            'description': f'{cat.title()} Item {i % 30}',
-            'food_category': cat,
-            'calories': max(10, cal * np.random.uniform(0.8, 1.2)),
-            'protein_g': max(0, prot * np.random.uniform(0.8, 1.2)),
-            'fat_g': max(0, fat * np.random.uniform(0.8, 1.2)),
-            'carbs_g': max(0, carb * np.random.uniform(0.8, 1.2)),
-            'fiber_g': max(0, fib * np.random.uniform(0.8, 1.2)),
-            'sugars_g': max(0, sug * np.random.uniform(0.8, 1.2)),
-            'sodium_mg': np.random.uniform(0, 800),
-            'vitamin_a_iu': np.random.uniform(0, 5000),
-            'vitamin_c_mg': np.random.uniform(0, 50),
-            'calcium_mg': np.random.uniform(0, 300),
-            'iron_mg': np.random.uniform(0, 5),
-            'potassium_mg': np.random.uniform(100, 800),
-            'magnesium_mg': np.random.uniform(10, 100),
-            'zinc_mg': np.random.uniform(0, 5),
-            'phosphorus_mg': np.random.uniform(50, 300),
-            'cost_per_serving': np.random.uniform(0.5, 5.0),
-            # Binary flags for allergens/dietary
-            'is_glutenfree': 1 if cat in ['vegetables', 'fruits', 'proteins', 'dairy'] else 0,
-            'is_nutfree': 0 if cat == 'nuts_seeds' else 1,
-            'is_vegan': 1 if cat in ['vegetables', 'fruits', 'grains', 'nuts_seeds', 'legumes'] else 0,
-        }
-        foods.append(food)
-    
-    df = pd.DataFrame(foods)
+    # Generate 288 base foods (realistic nutritional profiles), one column at a time
+    n_foods = 288
+    cat_idx = rng.integers(0, len(FOOD_CATEGORIES), size=n_foods)
+    cats = FOOD_CATEGORIES[cat_idx]
+    
+    # Add variance (±20% for realism); calories floored at 10, other macros at 0
+    macros = CATEGORY_PROFILES[cat_idx] * rng.uniform(0.8, 1.2, size=(n_foods, 6)).astype(np.float32)
+    macros = np.maximum(macros, np.array([10, 0, 0, 0, 0, 0], dtype=np.float32))
+    
+    # Columns are built in their final dtypes (int32 ids, float32 nutrients,
+    # uint8 flags) so the DataFrame needs no inference or conversion
+    micros = draw_uniform_columns(rng, n_foods, {
+        'sodium_mg': (0, 800),
+        'vitamin_a_iu': (0, 5000),
+        'vitamin_c_mg': (0, 50),
+        'calcium_mg': (0, 300),
+        'iron_mg': (0, 5),
+        'potassium_mg': (100, 800),
+        'magnesium_mg': (10, 100),
+        'zinc_mg': (0, 5),
+        'phosphorus_mg': (50, 300),
+        'cost_per_serving': (0.5, 5.0),
+    })
+    
+    df = pd.DataFrame({
+        'fdc_id': np.arange(100000, 100000 + n_foods, dtype=np.int32),
+        'description': [f'{cat.title()} Item {i % 30}' for i, cat in enumerate(cats)],
+        'food_category': cats,
+        'calories': macros[:, 0],
+        'protein_g': macros[:, 1],
+        'fat_g': macros[:, 2],
+        'carbs_g': macros[:, 3],
+        'fiber_g': macros[:, 4],
+        'sugars_g': macros[:, 5],
+        **micros,
+        # Binary flags for allergens/dietary
+        'is_glutenfree': np.isin(cats, ['vegetables', 'fruits', 'proteins', 'dairy']).astype(np.uint8),
+        'is_nutfree': (cats != 'nuts_seeds').astype(np.uint8),
+        'is_vegan': np.isin(cats, ['vegetables', 'fruits', 'grains', 'nuts_seeds', 'legumes']).astype(np.uint8),
+    }, copy=False)
     
     # Save base USDA data
     csv_path = DATA_DIR / 'usda-foods.csv'
@@ -121,7 +158,37 @@ def create_sample_usda_data():
     
     return df
 
-def generate_synthetic_augmentation(base_df, n_synthetic=500):
+def generate_synthetic_block(rng, n, fdc_start, label, categories, ranges, flag_thresholds):
+    """
+    Generate n synthetic foods of one class, column blocks at a time
+    
+    Args:
+        rng: np.random.Generator used for all random draws
+        n: Number of rows
+        fdc_start: First fdc_id (ids are consecutive)
+        label: Description prefix ('Healthy' -> 'Synthetic Healthy 0', ...)
+        categories: Array to draw food_category values from
+        ranges: Column -> (low, high) for uniform nutrient/cost draws
+        flag_thresholds: Binary column -> t; flag is 1 where U(0,1) > t
+    
+    Returns: DataFrame with n rows
+    """
+    block = {
+        'fdc_id': np.arange(fdc_start, fdc_start + n, dtype=np.int32),
+        'description': [f'Synthetic {label} {i}' for i in range(n)],
+        'food_category': rng.choice(categories, size=n),
+    }
+    # All range columns in one draw; flags likewise in one draw compared
+    # against the threshold row
+    block.update(draw_uniform_columns(rng, n, ranges))
+    
+    thresholds = np.array(list(flag_thresholds.values()), dtype=np.float32)
+    flags = (rng.random((n, len(thresholds)), dtype=np.float32) > thresholds).astype(np.uint8)
+    block.update(zip(flag_thresholds.keys(), flags.T))
+    
+    return pd.DataFrame(block, copy=False)
+
+def generate_synthetic_augmentation(base_df, rng, n_synthetic=500):
     """
     Generate synthetic training data by perturbing nutritional values
     
@@ -134,70 +201,62 @@ def generate_synthetic_augmentation(base_df, n_synthetic=500):
     """
     print(f"[Preprocess] Generating {n_synthetic} synthetic samples...")
     
-    synthetic_rows = []
     target_fit_ratio = 0.64  # 64% positive class (imbalanced)
     n_fit = int(n_synthetic * target_fit_ratio)
     n_unfit = n_synthetic - n_fit
     
+    # Synthetic foods inherit categories drawn from the base data
+    base_categories = base_df['food_category'].to_numpy()
+    
     # Generate positive samples (fit=1)
-    for i in range(n_fit):
-        base = base_df.sample(1).iloc[0].copy()
-        row = {
-            'fdc_id': 200000 + i,
-            'description': f'Synthetic Healthy {i}',
-            'food_category': base['food_category'],
-            'calories': np.random.uniform(100, 300),
-            'protein_g': np.random.uniform(12, 30),  # High protein
-            'fat_g': np.random.uniform(2, 15),
-            'carbs_g': np.random.uniform(10, 40),
-            'fiber_g': np.random.uniform(4, 12),  # High fiber
-            'sugars_g': np.random.uniform(0, 4),  # Low sugar
-            'sodium_mg': np.random.uniform(50, 600),
-            'vitamin_a_iu': np.random.uniform(500, 5000),
-            'vitamin_c_mg': np.random.uniform(5, 50),
-            'calcium_mg': np.random.uniform(50, 300),
-            'iron_mg': np.random.uniform(1, 5),
-            'potassium_mg': np.random.uniform(200, 800),
-            'magnesium_mg': np.random.uniform(30, 100),
-            'zinc_mg': np.random.uniform(1, 5),
-            'phosphorus_mg': np.random.uniform(100, 300),
-            'cost_per_serving': np.random.uniform(0.5, 1.8),  # Budget-friendly
-            'is_glutenfree': int(np.random.random() > 0.3),
-            'is_nutfree': int(np.random.random() > 0.2),
-            'is_vegan': int(np.random.random() > 0.5),
-        }
-        synthetic_rows.append(row)
+    fit_df = generate_synthetic_block(
+        rng, n_fit, fdc_start=200000, label='Healthy', categories=base_categories,
+        ranges={
+            'calories': (100, 300),
+            'protein_g': (12, 30),  # High protein
+            'fat_g': (2, 15),
+            'carbs_g': (10, 40),
+            'fiber_g': (4, 12),  # High fiber
+            'sugars_g': (0, 4),  # Low sugar
+            'sodium_mg': (50, 600),
+            'vitamin_a_iu': (500, 5000),
+            'vitamin_c_mg': (5, 50),
+            'calcium_mg': (50, 300),
+            'iron_mg': (1, 5),
+            'potassium_mg': (200, 800),
+            'magnesium_mg': (30, 100),
+            'zinc_mg': (1, 5),
+            'phosphorus_mg': (100, 300),
+            'cost_per_serving': (0.5, 1.8),  # Budget-friendly
+        },
+        flag_thresholds={'is_glutenfree': 0.3, 'is_nutfree': 0.2, 'is_vegan': 0.5},
+    )
     
     # Generate negative samples (fit=0)
-    for i in range(n_unfit):
-        base = base_df.sample(1).iloc[0].copy()
-        row = {
-            'fdc_id': 300000 + i,
-            'description': f'Synthetic Unhealthy {i}',
-            'food_category': base['food_category'],
-            'calories': np.random.uniform(200, 600),
-            'protein_g': np.random.uniform(0, 8),  # Low protein
-            'fat_g': np.random.uniform(10, 40),
-            'carbs_g': np.random.uniform(30, 80),
-            'fiber_g': np.random.uniform(0, 2),  # Low fiber
-            'sugars_g': np.random.uniform(10, 40),  # High sugar
-            'sodium_mg': np.random.uniform(400, 2000),
-            'vitamin_a_iu': np.random.uniform(0, 1000),
-            'vitamin_c_mg': np.random.uniform(0, 10),
-            'calcium_mg': np.random.uniform(0, 100),
-            'iron_mg': np.random.uniform(0, 2),
-            'potassium_mg': np.random.uniform(50, 300),
-            'magnesium_mg': np.random.uniform(5, 50),
-            'zinc_mg': np.random.uniform(0, 2),
-            'phosphorus_mg': np.random.uniform(30, 150),
-            'cost_per_serving': np.random.uniform(2.5, 5.0),  # Expensive
-            'is_glutenfree': int(np.random.random() > 0.7),
-            'is_nutfree': int(np.random.random() > 0.6),
-            'is_vegan': int(np.random.random() > 0.7),
-        }
-        synthetic_rows.append(row)
+    unfit_df = generate_synthetic_block(
+        rng, n_unfit, fdc_start=300000, label='Unhealthy', categories=base_categories,
+        ranges={
+            'calories': (200, 600),
+            'protein_g': (0, 8),  # Low protein
+            'fat_g': (10, 40),
+            'carbs_g': (30, 80),
+            'fiber_g': (0, 2),  # Low fiber
+            'sugars_g': (10, 40),  # High sugar
+            'sodium_mg': (400, 2000),
+            'vitamin_a_iu': (0, 1000),
+            'vitamin_c_mg': (0, 10),
+            'calcium_mg': (0, 100),
+            'iron_mg': (0, 2),
+            'potassium_mg': (50, 300),
+            'magnesium_mg': (5, 50),
+            'zinc_mg': (0, 2),
+            'phosphorus_mg': (30, 150),
+            'cost_per_serving': (2.5, 5.0),  # Expensive
+        },
+        flag_thresholds={'is_glutenfree': 0.7, 'is_nutfree': 0.6, 'is_vegan': 0.7},
+    )
     
-    synthetic_df = pd.DataFrame(synthetic_rows)
+    synthetic_df = pd.concat([fit_df, unfit_df], ignore_index=True)
     print(f"[Preprocess] Generated {n_fit} fit + {n_unfit} unfit samples")
     
     return synthetic_df
@@ -216,14 +275,16 @@ def compute_labels(df):
     Why: Simulates multi-objective optimization (health + budget + allergen safety)
     Matches typical user goals from onboarding (weight loss, budget $50-100/week)
     """
-    df['fit'] = (
-        (df['protein_g'] > 10) &
-        (df['sugars_g'] < 5) &
-        (df['fiber_g'] > 3) &
-        (df['cost_per_serving'] < 2)
-    ).astype(int)
+    # Combine on the raw ndarrays (no intermediate Series); int8 label
+    protein = df['protein_g'].to_numpy()
+    sugars = df['sugars_g'].to_numpy()
+    fiber = df['fiber_g'].to_numpy()
+    cost = df['cost_per_serving'].to_numpy()
+    df['fit'] = ((protein > 10) & (sugars < 5) & (fiber > 3) & (cost < 2)).view(np.int8)
     
-    print(f"[Preprocess] Label distribution: fit=1 ({df['fit'].sum()}, {df['fit'].mean()*100:.1f}%), fit=0 ({(1-df['fit']).sum()}, {(1-df['fit']).mean()*100:.1f}%)")
+    n = len(df)
+    fit_count = int(df['fit'].sum())
+    print(f"[Preprocess] Label distribution: fit=1 ({fit_count}, {100*fit_count/n:.1f}%), fit=0 ({n-fit_count}, {100*(n-fit_count)/n:.1f}%)")
     
     return df
 
@@ -241,17 +302,119 @@ def compute_derived_features(df):
     These ratios capture non-linear interactions between nutrients
     that single features miss (e.g., high fiber + low cal = filling)
     """
-    df['nutrient_density'] = (df['protein_g'] + df['fiber_g']) / (df['calories'] + 1)
-    df['sugar_to_carb_ratio'] = df['sugars_g'] / (df['carbs_g'] + 1)
+    # Ratios are computed in float32 into preallocated buffers (no temporary Series)
+    protein = df['protein_g'].to_numpy(np.float32)
+    fiber = df['fiber_g'].to_numpy(np.float32)
+    calories = df['calories'].to_numpy(np.float32)
+    sugars = df['sugars_g'].to_numpy(np.float32)
+    carbs = df['carbs_g'].to_numpy(np.float32)
+    
+    density = np.empty_like(protein)
+    np.add(protein, fiber, out=density)
+    np.divide(density, calories + 1, out=density)
+    
+    sugar_ratio = np.empty_like(sugars)
+    np.divide(sugars, carbs + 1, out=sugar_ratio)
+    
+    df['nutrient_density'] = density
+    df['sugar_to_carb_ratio'] = sugar_ratio
     
     print(f"[Preprocess] Added derived features: nutrient_density, sugar_to_carb_ratio")
     
     return df
 
-def preprocess_data():
+@memory.cache
+def fit_feature_pipeline(X_train, y_train, X_test, numerical_features,
+                         categorical_features, binary_features, k=10,
+                         pipeline_version=PIPELINE_VERSION):
+    """
+    Fit preprocessor + feature selector and SMOTE-resample the training set
+    
+    Why: This is the expensive part of preprocessing. Results are cached on
+    disk (joblib.Memory) keyed on the input data, so re-running with unchanged
+    data skips it. pipeline_version is part of the key: bump PIPELINE_VERSION
+    whenever this function changes so stale cache entries are not reused.
+    
+    k: Number of features kept by SelectKBest
+    
+    Returns: preprocessor, selector, feature_names, X_train_resampled,
+             y_train_resampled, X_test_selected
+    """
+    # Step 9: Create preprocessing pipeline
+    print("\n[Preprocess] Creating preprocessing pipeline...")
+    
+    # ColumnTransformer: Applies different transformations to different column types
+    # - Numerical: SimpleImputer (median) → StandardScaler (mean=0, std=1)
+    # - Categorical: OneHotEncoder (drop='first' avoids multicollinearity),
+    #   categories taken from the columns' CategoricalDtype so the one-hot
+    #   column order is fixed by FOOD_CATEGORIES, not by the data
+    # - Binary: passthrough (already 0/1)
+    # One-hot block is emitted sparse; the combined output stays sparse when its
+    # density is below sparse_threshold (selection and SMOTE accept either)
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(categories=[X_train[col].cat.categories.tolist() for col in categorical_features],
+                                  drop='first', handle_unknown='ignore', sparse_output=True, dtype=np.float32), categorical_features),
+            ('bin', 'passthrough', binary_features)
+        ],
+        remainder='drop',
+        sparse_threshold=0.3
+    )
+    
+    # Fit preprocessor on training data only (avoid data leakage)
+    X_train_transformed = preprocessor.fit_transform(X_train)
+    X_test_transformed = preprocessor.transform(X_test)
+    
+    # Get feature names after transformation
+    num_names = numerical_features
+    cat_names = preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features).tolist()
+    bin_names = binary_features
+    feature_names = num_names + cat_names + bin_names
+    
+    print(f"  - Features after transformation: {len(feature_names)}")
+    print(f"  - Feature names: {feature_names[:10]}... (showing first 10)")
+    
+    # Step 10: Feature selection (SelectKBest with ANOVA F-test)
+    # Why: Reduces from 25+ to 10 features, removes noise, speeds training
+    # F score: Ratio of between-class to within-class variance per feature
+    # (valid for real-valued scaled features, so no non-negative shift needed)
+    print(f"\n[Preprocess] Applying feature selection (SelectKBest f_classif, k={k})...")
+    
+    selector = SelectKBest(score_func=f_classif, k=min(k, len(feature_names)))
+    selector.fit(X_train_transformed, y_train)
+    X_train_selected = selector.transform(X_train_transformed)
+    X_test_selected = selector.transform(X_test_transformed)
+    
+    # Step 11: Apply SMOTE oversampling (training set only)
+    # Why: Balances 64/36 to 50/50, prevents RF bias toward majority
+    # Improves recall on minority class (unfit foods)
+    print("\n[Preprocess] Applying SMOTE oversampling (training set only)...")
+    fit_count = int(y_train.sum())
+    print(f"  - Before SMOTE: fit=1 {fit_count}, fit=0 {len(y_train)-fit_count}")
+    
+    # Neighbor search on a multi-core KD-tree (n_neighbors=6: SMOTE's 5
+    # neighbors plus the query point itself)
+    nn = NearestNeighbors(n_neighbors=6, algorithm='kd_tree', n_jobs=-1)
+    smote = SMOTE(random_state=RANDOM_STATE, k_neighbors=nn)
+    X_train_resampled, y_train_resampled = smote.fit_resample(X_train_selected, y_train)
+    
+    fit_count = int(y_train_resampled.sum())
+    print(f"  - After SMOTE: fit=1 {fit_count}, fit=0 {len(y_train_resampled)-fit_count}")
+    print(f"  - Train size increased: {len(y_train)} → {len(y_train_resampled)}")
+    
+    return preprocessor, selector, feature_names, X_train_resampled, y_train_resampled, X_test_selected
+
+def preprocess_data(n_synthetic=500, k=10, save=True):
     """
     Main preprocessing pipeline
     
+    Args:
+        n_synthetic: Number of synthetic rows added to the base data
+        k: Number of features kept by SelectKBest
+        save: Write the artifacts below to ML_DIR. preprocess_grid() passes
+              False so parallel runs don't overwrite each other's files
+    
     Steps:
     1. Load/create USDA data (288 rows)
     2. Augment with synthetics (500 rows) → 788 total
@@ -259,14 +422,18 @@ def preprocess_data():
     4. Handle missing values (median imputation for numerical)
     5. Encode categoricals (OneHot for food_category)
     6. Scale numericals (StandardScaler: mean=0, std=1)
-    7. Feature selection (SelectKBest chi2: 25→10 features)
+    7. Feature selection (SelectKBest f_classif: 25→10 features)
     8. Split 80/20 stratified (preserves class ratio)
     9. Apply SMOTE on training set only (balance to 50/50)
     10. Save preprocessor + data
     
-    Output:
-    - processed_data.csv (full dataset with labels)
-    - train_data.csv, test_data.csv (stratified split)
+    Returns: dict with the fitted preprocessor/selector, selected feature
+    names and the train/test arrays
+    
+    Output (when save=True):
+    - processed_data.parquet (full dataset with labels)
+    - processed_data.csv (same, only if DUMP_FULL_CSV is set)
+    - train.npz, test.npz (stratified split: X, y, feature names)
     - preprocessor.pkl (fitted ColumnTransformer for predict.py)
     - feature_names.json (for interpretability)
     """
@@ -274,16 +441,19 @@ def preprocess_data():
     print("MEAL RECOMMENDATION ML PIPELINE - DATA PREPROCESSING")
     print("="*60 + "\n")
     
+    # Single seeded generator for all synthetic data (reproducible per run)
+    rng = np.random.default_rng(RANDOM_STATE)
+    
     # Step 1: Load or create USDA data
     usda_path = DATA_DIR / 'usda-foods.csv'
     if usda_path.exists():
         print(f"[Preprocess] Loading existing USDA data from {usda_path}")
         base_df = pd.read_csv(usda_path)
     else:
-        base_df = create_sample_usda_data()
+        base_df = create_sample_usda_data(rng)
     
     # Step 2: Augment with synthetic data
-    synthetic_df = generate_synthetic_augmentation(base_df, n_synthetic=500)
+    synthetic_df = generate_synthetic_augmentation(base_df, rng, n_synthetic=n_synthetic)
     df = pd.concat([base_df, synthetic_df], ignore_index=True)
     print(f"[Preprocess] Combined dataset: {len(df)} total rows")
     
@@ -307,139 +477,182 @@ def preprocess_data():
     
     # Step 6: Handle missing values
     print("\n[Preprocess] Handling missing values...")
-    for col in numerical_features:
-        if df[col].isnull().sum() > 0:
-            median_val = df[col].median()
-            df[col].fillna(median_val, inplace=True)
-            print(f"  - Imputed {col} with median {median_val:.2f}")
-    
-    for col in categorical_features:
-        df[col].fillna('unknown', inplace=True)
+    # One vectorized pass over the numerical block (medians per column)
+    missing_cols = df[numerical_features].columns[df[numerical_features].isna().any()].tolist()
+    if missing_cols:
+        medians = df[missing_cols].median(numeric_only=True)
+        df[missing_cols] = df[missing_cols].fillna(medians)
+        print(f"  - Imputed {len(missing_cols)} columns with median: {missing_cols}")
+    
+    if df[categorical_features].isna().any().any():
+        df[categorical_features] = df[categorical_features].fillna('unknown')
+    
+    # Model inputs in float32 (numerical) / uint8 (binary flags), matching
+    # predict.py's FOOD_DTYPES; halves memory traffic through scaler/selector/SMOTE
+    df[numerical_features] = df[numerical_features].astype(np.float32)
+    df[binary_features] = df[binary_features].astype(np.uint8)
+    
+    # food_category as a fixed CategoricalDtype (int8 codes instead of Python
+    # strings); categories not in FOOD_CATEGORIES (e.g. 'unknown') go last
+    observed = df['food_category'].unique()
+    extra = sorted(set(observed) - set(FOOD_CATEGORIES))
+    df['food_category'] = df['food_category'].astype(
+        pd.CategoricalDtype(categories=FOOD_CATEGORIES.tolist() + extra, ordered=False)
+    )
     
     # Step 7: Prepare features and target
     X = df[numerical_features + categorical_features + binary_features]
-    y = df['fit']
+    y = df['fit'].to_numpy()
     
     # Step 8: Split dataset (80/20 stratified)
     # Why stratified: Preserves 64/36 class ratio in both train/test
     # Prevents biased evaluation on imbalanced nutrition labels
     print(f"\n[Preprocess] Splitting data 80/20 stratified (random_state={RANDOM_STATE})...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=RANDOM_STATE, stratify=y
+    # Index arrays from StratifiedShuffleSplit (same split as train_test_split
+    # with stratify=y), then one gather per matrix
+    sss = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=RANDOM_STATE)
+    train_idx, test_idx = next(sss.split(np.zeros(len(y)), y))
+    X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
+    
+    train_fit, test_fit = int(y_train.sum()), int(y_test.sum())
+    print(f"  - Train: {len(X_train)} samples (fit={train_fit}, {100*train_fit/len(y_train):.1f}%)")
+    print(f"  - Test: {len(X_test)} samples (fit={test_fit}, {100*test_fit/len(y_test):.1f}%)")
+    
+    # Steps 9-11: Preprocessor, feature selection, SMOTE (cached on disk)
+    preprocessor, selector, feature_names, X_train_resampled, y_train_resampled, X_test_selected = (
+        fit_feature_pipeline(X_train, y_train, X_test, numerical_features,
+                             categorical_features, binary_features, k=k)
     )
     
-    print(f"  - Train: {len(X_train)} samples (fit={y_train.sum()}, {y_train.mean()*100:.1f}%)")
-    print(f"  - Test: {len(X_test)} samples (fit={y_test.sum()}, {y_test.mean()*100:.1f}%)")
-    
-    # Step 9: Create preprocessing pipeline
-    print("\n[Preprocess] Creating preprocessing pipeline...")
-    
-    # ColumnTransformer: Applies different transformations to different column types
-    # - Numerical: SimpleImputer (median) → StandardScaler (mean=0, std=1)
-    # - Categorical: OneHotEncoder (drop='first' avoids multicollinearity)
-    # - Binary: passthrough (already 0/1)
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numerical_features),
-            ('cat', OneHotEncoder(drop='first', handle_unknown='ignore'), categorical_features),
-            ('bin', 'passthrough', binary_features)
-        ],
-        remainder='drop'
-    )
-    
-    # Fit preprocessor on training data only (avoid data leakage)
-    X_train_transformed = preprocessor.fit_transform(X_train)
-    X_test_transformed = preprocessor.transform(X_test)
-    
-    # Get feature names after transformation
-    num_names = numerical_features
-    cat_names = preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features).tolist()
-    bin_names = binary_features
-    feature_names = num_names + cat_names + bin_names
-    
-    print(f"  - Features after transformation: {len(feature_names)}")
-    print(f"  - Feature names: {feature_names[:10]}... (showing first 10)")
-    
-    # Step 10: Feature selection (SelectKBest with chi2)
-    # Why: Reduces from 25+ to 10 features, removes noise, speeds training
-    # chi2 score: Measures dependency between feature and target
-    print("\n[Preprocess] Applying feature selection (SelectKBest chi2, k=10)...")
-    
-    # Note: chi2 requires non-negative features, so we shift if needed
-    X_train_nonneg = X_train_transformed - X_train_transformed.min() + 1e-9
-    X_test_nonneg = X_test_transformed - X_test_transformed.min() + 1e-9
-    
-    selector = SelectKBest(score_func=chi2, k=min(10, len(feature_names)))
-    X_train_selected = selector.fit_transform(X_train_nonneg, y_train)
-    X_test_selected = selector.transform(X_test_nonneg)
-    
     # Get selected feature names
     selected_idx = selector.get_support(indices=True)
     selected_features = [feature_names[i] for i in selected_idx]
-    chi2_scores = selector.scores_[selected_idx]
-    
-    print(f"  - Selected {X_train_selected.shape[1]} features:")
-    for feat, score in zip(selected_features, chi2_scores):
-        print(f"    • {feat}: chi2={score:.2f}")
-    
-    # Step 11: Apply SMOTE oversampling (training set only)
-    # Why: Balances 64/36 to 50/50, prevents RF bias toward majority
-    # Improves recall on minority class (unfit foods)
-    print("\n[Preprocess] Applying SMOTE oversampling (training set only)...")
-    print(f"  - Before SMOTE: fit=1 {y_train.sum()}, fit=0 {(1-y_train).sum()}")
-    
-    smote = SMOTE(random_state=RANDOM_STATE, k_neighbors=5)
-    X_train_resampled, y_train_resampled = smote.fit_resample(X_train_selected, y_train)
-    
-    print(f"  - After SMOTE: fit=1 {y_train_resampled.sum()}, fit=0 {(1-y_train_resampled).sum()}")
-    print(f"  - Train size increased: {len(y_train)} → {len(y_train_resampled)}")
-    
-    # Step 12: Save everything
-    print("\n[Preprocess] Saving preprocessed data and artifacts...")
-    
-    # Save full dataset with labels
-    df.to_csv(ML_DIR / 'processed_data.csv', index=False)
-    print(f"  - Saved processed_data.csv ({len(df)} rows)")
-    
-    # Save train/test splits (with selected features)
-    train_df = pd.DataFrame(X_train_resampled, columns=selected_features)
-    train_df['fit'] = y_train_resampled.values
-    train_df.to_csv(ML_DIR / 'train_data.csv', index=False)
-    print(f"  - Saved train_data.csv ({len(train_df)} rows)")
-    
-    test_df = pd.DataFrame(X_test_selected, columns=selected_features)
-    test_df['fit'] = y_test.values
-    test_df.to_csv(ML_DIR / 'test_data.csv', index=False)
-    print(f"  - Saved test_data.csv ({len(test_df)} rows)")
-    
-    # Save preprocessor pipeline
-    joblib.dump(preprocessor, ML_DIR / 'preprocessor.pkl')
-    print(f"  - Saved preprocessor.pkl")
-    
-    # Save feature selector
-    joblib.dump(selector, ML_DIR / 'feature_selector.pkl')
-    print(f"  - Saved feature_selector.pkl")
-    
-    # Save feature names
-    feature_info = {
-        'all_features': feature_names,
-        'selected_features': selected_features,
-        'chi2_scores': chi2_scores.tolist()
-    }
-    with open(ML_DIR / 'feature_names.json', 'w') as f:
-        json.dump(feature_info, f, indent=2)
-    print(f"  - Saved feature_names.json")
+    f_scores = selector.scores_[selected_idx]
+    
+    print(f"\n[Preprocess] Selected {len(selected_features)} features:")
+    for feat, score in zip(selected_features, f_scores):
+        print(f"    • {feat}: F={score:.2f}")
+    
+    # Train/test splits (with selected features) as plain arrays: float32
+    # features, int8 labels. Densify only here, for the selected columns
+    if hasattr(X_train_resampled, 'toarray'):
+        X_train_resampled = X_train_resampled.toarray()
+    if hasattr(X_test_selected, 'toarray'):
+        X_test_selected = X_test_selected.toarray()
+    X_train_resampled = X_train_resampled.astype(np.float32, copy=False)
+    X_test_selected = X_test_selected.astype(np.float32, copy=False)
+    y_train_resampled = np.asarray(y_train_resampled, dtype=np.int8)
+    y_test = np.asarray(y_test, dtype=np.int8)
+    
+    if save:
+        # Step 12: Save everything (plus the feature names for train.py)
+        print("\n[Preprocess] Saving preprocessed data and artifacts...")
+        
+        # Save full dataset with labels as Parquet (typed columns, zstd): much
+        # faster to write/read than CSV and no dtype re-inference downstream
+        df.to_parquet(ML_DIR / 'processed_data.parquet', engine='pyarrow', compression='zstd', index=False)
+        print(f"  - Saved processed_data.parquet ({len(df)} rows)")
+        
+        # CSV copy only on request (DUMP_FULL_CSV=1), for ad-hoc inspection;
+        # predict.py reads the Parquet file
+        if os.environ.get('DUMP_FULL_CSV'):
+            df.to_csv(ML_DIR / 'processed_data.csv', index=False)
+            print(f"  - Saved processed_data.csv ({len(df)} rows)")
+        
+        np.savez_compressed(
+            ML_DIR / 'train.npz',
+            X=X_train_resampled,
+            y=y_train_resampled,
+            features=np.array(selected_features)
+        )
+        print(f"  - Saved train.npz ({len(y_train_resampled)} rows)")
+        
+        np.savez_compressed(
+            ML_DIR / 'test.npz',
+            X=X_test_selected,
+            y=y_test,
+            features=np.array(selected_features)
+        )
+        print(f"  - Saved test.npz ({len(y_test)} rows)")
+        
+        # Save preprocessor pipeline
+        # (uncompressed, protocol 5: predict.py memory-maps these on load)
+        joblib.dump(preprocessor, ML_DIR / 'preprocessor.pkl', compress=0, protocol=5)
+        print(f"  - Saved preprocessor.pkl")
+        
+        # Save feature selector
+        joblib.dump(selector, ML_DIR / 'feature_selector.pkl', compress=0, protocol=5)
+        print(f"  - Saved feature_selector.pkl")
+        
+        # Save feature names
+        feature_info = {
+            'all_features': feature_names,
+            'selected_features': selected_features,
+            'f_scores': f_scores.tolist()
+        }
+        with open(ML_DIR / 'feature_names.json', 'w') as f:
+            json.dump(feature_info, f, indent=2)
+        print(f"  - Saved feature_names.json")
     
     print("\n" + "="*60)
     print("PREPROCESSING COMPLETE!")
     print("="*60)
     print(f"Total samples: {len(df)}")
-    print(f"Train samples: {len(train_df)} (after SMOTE)")
-    print(f"Test samples: {len(test_df)}")
+    print(f"Train samples: {len(y_train_resampled)} (after SMOTE)")
+    print(f"Test samples: {len(y_test)}")
     print(f"Features: {len(selected_features)} (selected from {len(feature_names)})")
     print(f"Class distribution: {df['fit'].value_counts().to_dict()}")
     print("\nNext step: Run train.py for model training")
     print("="*60 + "\n")
+    
+    return {
+        'n_synthetic': n_synthetic,
+        'k': k,
+        'preprocessor': preprocessor,
+        'selector': selector,
+        'selected_features': selected_features,
+        'X_train': X_train_resampled,
+        'y_train': y_train_resampled,
+        'X_test': X_test_selected,
+        'y_test': y_test,
+    }
+
+def preprocess_grid(grid, n_jobs=-1):
+    """
+    Run preprocess_data() for each (n_synthetic, k) pair in parallel
+    
+    Why: Tuning re-runs the whole pipeline per grid value; the runs are
+    independent and compute-bound, so they scale with cores. Uses the loky
+    (process) backend: SMOTE and the sklearn steps don't release the GIL
+    consistently, so threads would mostly serialize.
+    
+    Runs don't write artifacts (save=False); pick one and train on its
+    arrays, or re-run preprocess_data() with its values to save it.
+    
+    Args:
+        grid: Iterable of (n_synthetic, k) pairs
+        n_jobs: Worker processes (-1 = all cores)
+    
+    Returns: list of preprocess_data() results, in grid order
+    """
+    # Create the base USDA file up front so workers only read it
+    if not (DATA_DIR / 'usda-foods.csv').exists():
+        create_sample_usda_data(np.random.default_rng(RANDOM_STATE))
+    
+    return Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(preprocess_data)(n_synthetic, k, save=False) for n_synthetic, k in grid
+    )
 
 if __name__ == '__main__':
-    preprocess_data()
+    if '--grid' in sys.argv[1:]:
+        grid = [(n_synthetic, k) for n_synthetic in (250, 500, 1000) for k in (5, 10, 15)]
+        results = preprocess_grid(grid)
+        print("\n[Preprocess] Grid summary:")
+        for res in results:
+            print(f"  - n_synthetic={res['n_synthetic']}, k={res['k']}: "
+                  f"train={len(res['y_train'])}, test={len(res['y_test'])}, "
+                  f"features={res['selected_features']}")
+        print("Save a configuration with preprocess_data(n_synthetic, k)")
+    else:
+        preprocess_data()
@@ -1,47 +1,46 @@
 """
-Random Forest Model Training for Meal Recommendation System
+Gradient Boosting Model Training for Meal Recommendation System
 Author: NutriSolve ML Team
 Date: October 2025
 
 Theoretical Foundation:
-Random Forest Classifier - Bagging ensemble of N decision trees
+HistGradientBoostingClassifier - Boosted ensemble of M histogram-based trees
 Mathematical Formulation:
-- Each tree T_i builds via recursive splits minimizing Gini impurity:
-  G(node_m) = 1 - Σ(k=1 to K) p_mk²
-  where p_mk = proportion of class k in node m, K = number of classes
+- Features are binned once into 64 quantile bins (uint8); each split is found by
+  scanning a per-feature gradient histogram (O(bins)) instead of the sorted
+  raw values (O(N log N))
   
-- Aggregate prediction for classification:
-  P(y=1|x) = (1/N) Σ(i=1 to N) P_i(y=1|x)
-  where P_i is the prediction from tree T_i's leaf node
+- Trees are added stagewise, each fitting the gradient of the log-loss:
+  F_m(x) = F_{m-1}(x) + η · T_m(x)
+  where η = learning_rate, T_m fits -∂L/∂F at F_{m-1}
   
-- Final classification: majority vote across all trees
-  ŷ = argmax_k Σ(i=1 to N) I(T_i(x) = k)
+- Probability for classification:
+  P(y=1|x) = σ(F_M(x)) = 1 / (1 + e^(-F_M(x)))
 
-Why Random Forest:
+Why Histogram Gradient Boosting:
 1. Handles non-linear relationships (nutrition data: fiber-calorie interactions)
-2. Robust to outliers and noise (variable vitamin levels across foods)
-3. Bagging reduces variance: σ_ensemble ≈ σ_tree / √N
-4. Feature importance via Gini decrease (interpretability)
-5. No hyperparameter sensitivity (vs SVM kernel tuning)
+2. Binned split search: training is much faster than exact-split forests
+3. Boosting reduces bias; early stopping on a validation split limits variance
+4. Feature importance via permutation importance (interpretability)
+5. Few hyperparameters that matter (iterations, depth, learning rate)
 6. Naturally handles imbalanced data with class_weight='balanced'
 
 Hyperparameter Tuning:
-GridSearchCV with 5-fold cross-validation on training set
+HalvingGridSearchCV (successive halving) with 5-fold cross-validation on training set
 Scoring: f1_macro (balances precision and recall on imbalanced classes)
-Search space: n_estimators [50,100,200], max_depth [5,10,15], min_samples_split [2,5,10]
+Search space: max_iter [100,200,400], max_depth [5,10,15], learning_rate [0.05,0.1]
 """
 
 import pandas as pd
 import numpy as np
 import joblib
-import json
+import orjson
 from pathlib import Path
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import GridSearchCV, cross_val_score
-from sklearn.metrics import (
-    accuracy_score, f1_score, precision_score, recall_score,
-    classification_report, confusion_matrix, roc_auc_score
-)
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV, cross_val_score
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -49,10 +48,52 @@ warnings.filterwarnings('ignore')
 RANDOM_STATE = 42
 np.random.seed(RANDOM_STATE)
 
+# Grow the tuned model to twice its max_iter after the search (see extend_model)
+EXTEND_TREES = False
+
+# Score the training set too (for the train-test gap); turn off to score test only
+COMPUTE_TRAIN_METRICS = True
+
 # Define paths
 BASE_DIR = Path(__file__).parent.parent
 ML_DIR = BASE_DIR / 'ml'
 
+def load_split(name):
+    """
+    Load one split ('train' or 'test') written by preprocess.py
+    
+    Why: train.npz/test.npz are compressed, so every run would decompress
+    them again. The arrays are unpacked once into uncompressed .npy files
+    next to the archive (refreshed when the .npz is newer) and memory-mapped
+    from there: repeated runs skip decompression, and loky workers in the
+    search share the mapped pages instead of receiving pickled copies.
+    Features stay float32 on disk for size; the boosted model converts them
+    to float64 itself when it validates X.
+    
+    Returns: X (float32, C-contiguous), y (int8), feature_names
+    """
+    npz_path = ML_DIR / f'{name}.npz'
+    npy_paths = {key: ML_DIR / f'{name}_{key}.npy' for key in ('X', 'y')}
+    
+    with np.load(npz_path) as data:
+        feature_names = data['features'].tolist()
+        stale = any(
+            not path.exists() or path.stat().st_mtime < npz_path.stat().st_mtime
+            for path in npy_paths.values()
+        )
+        if stale:
+            # C-contiguous float32 features / int8 labels (what preprocess.py
+            # writes, so normally no conversion). float32 halves the file and
+            # the pages the workers map; HistGradientBoostingClassifier still
+            # upcasts X to float64 on each fit/predict, a cheap copy next to
+            # the binning and tree building it feeds
+            np.save(npy_paths['X'], np.ascontiguousarray(data['X'], dtype=np.float32))
+            np.save(npy_paths['y'], data['y'].astype(np.int8, copy=False))
+    
+    X = np.load(npy_paths['X'], mmap_mode='r')
+    y = np.load(npy_paths['y'], mmap_mode='r')
+    return X, y, feature_names
+
 def load_training_data():
     """
     Load preprocessed training and test data
@@ -60,20 +101,8 @@ def load_training_data():
     """
     print("[Train] Loading preprocessed data...")
     
-    train_df = pd.read_csv(ML_DIR / 'train_data.csv')
-    test_df = pd.read_csv(ML_DIR / 'test_data.csv')
-    
-    # Load feature names
-    with open(ML_DIR / 'feature_names.json', 'r') as f:
-        feature_info = json.load(f)
-    
-    feature_names = feature_info['selected_features']
-    
-    # Separate features and target
-    X_train = train_df[feature_names].values
-    y_train = train_df['fit'].values
-    X_test = test_df[feature_names].values
-    y_test = test_df['fit'].values
+    X_train, y_train, feature_names = load_split('train')
+    X_test, y_test, _ = load_split('test')
     
     print(f"  - Train: {X_train.shape[0]} samples × {X_train.shape[1]} features")
     print(f"  - Test: {X_test.shape[0]} samples × {X_test.shape[1]} features")
@@ -84,60 +113,83 @@ def load_training_data():
 
 def perform_hyperparameter_tuning(X_train, y_train):
     """
-    Hyperparameter tuning via GridSearchCV
+    Hyperparameter tuning via HalvingGridSearchCV
     
     Search Strategy:
-    - Exhaustive grid search (small parameter space)
+    - Successive halving over the full grid: every candidate is scored on a
+      small sample budget, the best third (factor=3) move on with 3× the
+      samples, until the last round uses the whole training set
+      Why: losing configs never get a full-size fit
     - 5-fold cross-validation (balances bias-variance)
     - Scoring: f1_macro (harmonic mean of precision/recall per class, then averaged)
       Why: Handles imbalanced classes better than accuracy
       Formula: F1_macro = (1/K) Σ(k=1 to K) 2·(precision_k · recall_k)/(precision_k + recall_k)
     
     Parameter Grid:
-    - n_estimators: Number of trees [50, 100, 200]
-      More trees → lower variance, but diminishing returns >100
+    - max_iter: Maximum boosting iterations (trees) [100, 200, 400]
+      Upper bound only: early stopping ends training once validation loss stalls
     - max_depth: Max tree depth [5, 10, 15]
       Deeper → more complex splits, but risk overfitting
-    - min_samples_split: Min samples to split node [2, 5, 10]
-      Higher → more conservative splits, prevents overfitting
+    - learning_rate: Shrinkage per tree [0.05, 0.1]
+      Lower → smoother fit, needs more iterations
     
     Why GridSearch over RandomSearch:
-    Small parameter space (3×3×3=27 combinations) allows exhaustive search
-    Ensures global optimum within grid (no stochastic sampling bias)
+    Small parameter space (3×3×2=18 combinations): every combination is
+    scored (no stochastic sampling bias); halving only trims the budget of
+    combinations that lose early
     """
     print("\n[Train] Starting hyperparameter tuning...")
-    print("  - Method: GridSearchCV")
+    print("  - Method: HalvingGridSearchCV (successive halving, factor=3)")
     print("  - Cross-validation: 5-fold")
     print("  - Scoring: f1_macro (balanced for imbalanced classes)")
     
     # Define parameter grid
     param_grid = {
-        'n_estimators': [50, 100, 200],        # Number of trees
+        'max_iter': [100, 200, 400],            # Boosting iterations (trees)
         'max_depth': [5, 10, 15],               # Tree depth
-        'min_samples_split': [2, 5, 10],        # Min samples to split
-        'class_weight': ['balanced'],           # Handle imbalance
-        'random_state': [RANDOM_STATE]          # Reproducibility
+        'learning_rate': [0.05, 0.1],           # Shrinkage
     }
     
-    print(f"  - Parameter grid: {len(param_grid['n_estimators']) * len(param_grid['max_depth']) * len(param_grid['min_samples_split'])} combinations")
+    print(f"  - Parameter grid: {len(param_grid['max_iter']) * len(param_grid['max_depth']) * len(param_grid['learning_rate'])} combinations")
     
     # Initialize base model
-    rf_base = RandomForestClassifier(random_state=RANDOM_STATE)
+    # Histogram-based: features are binned once per fit, then splits come from
+    # O(bins) histogram scans instead of sorting every raw value
+    # max_bins=64: 64 quantile bins per feature (instead of 255) keeps each
+    # histogram small; bins are learned in fit and reused by predict, so
+    # predict.py needs no separate discretizer
+    # Fixed settings live on the estimator, not as single-value grid entries:
+    # class_weight='balanced' handles imbalance, random_state for reproducibility
+    hgb_base = HistGradientBoostingClassifier(
+        random_state=RANDOM_STATE, class_weight='balanced',
+        early_stopping=True, max_bins=64
+    )
     
-    # GridSearchCV: Exhaustive search with cross-validation
-    grid_search = GridSearchCV(
-        estimator=rf_base,
+    # HalvingGridSearchCV: Successive-halving search with cross-validation
+    # min_resources='exhaust': first-round sample size is chosen so the last
+    # round uses all training samples
+    grid_search = HalvingGridSearchCV(
+        estimator=hgb_base,
         param_grid=param_grid,
+        factor=3,                  # Keep best 1/3 each round, 3× samples
+        resource='n_samples',
+        min_resources='exhaust',
         cv=5,                      # 5-fold cross-validation
         scoring='f1_macro',        # Evaluation metric
         n_jobs=-1,                 # Use all CPU cores
         verbose=1,                 # Progress updates
-        return_train_score=True    # Track train scores for overfitting detection
+        return_train_score=False   # Only test scores are reported below
     )
     
     # Fit grid search
-    print("\n[Train] Fitting GridSearchCV (this may take a few minutes)...")
-    grid_search.fit(X_train, y_train)
+    print("\n[Train] Fitting HalvingGridSearchCV (this may take a few minutes)...")
+    # Process-based workers (loky): tree fitting holds the GIL in parts, so
+    # threads under-scale. loky also caps each worker's OpenMP threads (used
+    # inside HistGradientBoosting) so workers × threads don't oversubscribe.
+    # The backend only picks the worker type; how many fits are queued ahead
+    # is left to the search's defaults
+    with joblib.parallel_backend('loky', n_jobs=-1):
+        grid_search.fit(X_train, y_train)
     
     # Extract best parameters and scores
     best_params = grid_search.best_params_
@@ -147,24 +199,71 @@ def perform_hyperparameter_tuning(X_train, y_train):
     print(f"  - Best cross-val f1_macro: {best_score:.4f}")
     print(f"  - Best parameters:")
     for param, value in best_params.items():
-        if param != 'random_state':
-            print(f"    • {param}: {value}")
+        print(f"    • {param}: {value}")
     
     # Get best model
     best_model = grid_search.best_estimator_
     
     # Display top 5 configurations
+    # (one row per candidate per round; iter/n_resources show the round's budget)
+    # Read straight from the cv_results_ arrays (no DataFrame of every column)
     print("\n[Train] Top 5 configurations by f1_macro:")
-    results_df = pd.DataFrame(grid_search.cv_results_)
-    top_5 = results_df.nlargest(5, 'mean_test_score')[
-        ['param_n_estimators', 'param_max_depth', 'param_min_samples_split', 
-         'mean_test_score', 'std_test_score']
-    ]
-    print(top_5.to_string(index=False))
+    cvr = grid_search.cv_results_
+    scores = cvr['mean_test_score']
+    k = min(5, scores.size)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind='stable')]
+    
+    print(f"{'iter':>4} {'n_resources':>11} {'max_iter':>8} {'max_depth':>9} {'learning_rate':>13} {'mean_f1':>8} {'std_f1':>8}")
+    for i in top:
+        print(f"{cvr['iter'][i]:>4} {cvr['n_resources'][i]:>11} {cvr['param_max_iter'][i]:>8} "
+              f"{cvr['param_max_depth'][i]:>9} {cvr['param_learning_rate'][i]:>13} "
+              f"{scores[i]:>8.4f} {cvr['std_test_score'][i]:>8.4f}")
     
     return best_model, best_params
 
-def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names):
+def extend_model(model, X_train, y_train):
+    """
+    Continue boosting the tuned model up to 2× its max_iter
+    
+    Why: With warm_start=True, fit() keeps the trees already built and only
+    adds new iterations, instead of rebuilding the model from scratch.
+    Early stopping still applies, so a model that stopped before max_iter
+    may gain few or no trees.
+    
+    Returns: the same model, refitted in place
+    """
+    n_before = model.n_iter_
+    model.set_params(warm_start=True, max_iter=model.max_iter * 2)
+    model.fit(X_train, y_train)
+    print(f"\n[Train] Extended model: {n_before} → {model.n_iter_} iterations (max_iter={model.max_iter})")
+    return model
+
+def scores_from_confusion(cm):
+    """
+    Accuracy and macro precision/recall/F1 from a confusion matrix
+    
+    Why: Each sklearn score function rebuilds the confusion matrix from the
+    label vectors; deriving all four from one matrix needs a single pass.
+    Classes with no predicted (or no actual) samples score 0, like sklearn's
+    zero_division default.
+    
+    Returns: accuracy, precision_macro, recall_macro, f1_macro
+    """
+    tp = np.diag(cm).astype(np.float64)
+    predicted = cm.sum(axis=0)
+    actual = cm.sum(axis=1)
+    
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+    
+    accuracy = tp.sum() / cm.sum()
+    return accuracy, precision.mean(), recall.mean(), f1.mean()
+
+def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names,
+                   compute_train_metrics=True):
     """
     Comprehensive model evaluation on training and test sets
     
@@ -180,46 +279,55 @@ def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names):
     - Accuracy insufficient for imbalanced data (can be high by predicting majority)
     - F1 balances precision/recall (critical for both false positives and false negatives)
     - ROC-AUC measures ranking quality (important for top-k recommendations)
+    
+    compute_train_metrics=False skips scoring the training set (only used for
+    the train-test gap); metrics['train'] is then None
     """
     print("\n[Train] Evaluating model performance...")
     
-    # Predictions
-    y_train_pred = model.predict(X_train)
-    y_test_pred = model.predict(X_test)
-    
-    # Probabilities for ROC-AUC
-    y_train_proba = model.predict_proba(X_train)[:, 1]
+    # Probabilities (for ROC-AUC) computed once per set; labels derived from
+    # them instead of a second pass through the trees. predict() is argmax
+    # over [1-p, p], which picks class 0 on a tie, hence p > 0.5
     y_test_proba = model.predict_proba(X_test)[:, 1]
+    y_test_pred = (y_test_proba > 0.5).astype(np.int8)
     
-    # Training set metrics
-    train_acc = accuracy_score(y_train, y_train_pred)
-    train_f1 = f1_score(y_train, y_train_pred, average='macro')
-    train_precision = precision_score(y_train, y_train_pred, average='macro')
-    train_recall = recall_score(y_train, y_train_pred, average='macro')
-    train_auc = roc_auc_score(y_train, y_train_proba)
-    
-    # Test set metrics
-    test_acc = accuracy_score(y_test, y_test_pred)
-    test_f1 = f1_score(y_test, y_test_pred, average='macro')
-    test_precision = precision_score(y_test, y_test_pred, average='macro')
-    test_recall = recall_score(y_test, y_test_pred, average='macro')
+    # Test set metrics (one confusion matrix, all scores derived from it)
+    cm = confusion_matrix(y_test, y_test_pred, labels=[0, 1])
+    test_acc, test_precision, test_recall, test_f1 = scores_from_confusion(cm)
     test_auc = roc_auc_score(y_test, y_test_proba)
+    test_scores = (test_acc, test_f1, test_precision, test_recall, test_auc)
+    
+    # Training set metrics
+    train_scores = None
+    if compute_train_metrics:
+        y_train_proba = model.predict_proba(X_train)[:, 1]
+        y_train_pred = (y_train_proba > 0.5).astype(np.int8)
+        cm_train = confusion_matrix(y_train, y_train_pred, labels=[0, 1])
+        train_acc, train_precision, train_recall, train_f1 = scores_from_confusion(cm_train)
+        train_auc = roc_auc_score(y_train, y_train_proba)
+        train_scores = (train_acc, train_f1, train_precision, train_recall, train_auc)
     
     # Print summary table
+    metric_labels = ['Accuracy', 'F1-score (macro)', 'Precision (macro)', 'Recall (macro)', 'ROC-AUC']
     print("\n" + "="*70)
     print("MODEL PERFORMANCE SUMMARY")
     print("="*70)
-    print(f"{'Metric':<20} {'Training':<20} {'Test':<20} {'Difference':<10}")
-    print("-"*70)
-    print(f"{'Accuracy':<20} {train_acc:>19.4f} {test_acc:>19.4f} {abs(train_acc-test_acc):>9.4f}")
-    print(f"{'F1-score (macro)':<20} {train_f1:>19.4f} {test_f1:>19.4f} {abs(train_f1-test_f1):>9.4f}")
-    print(f"{'Precision (macro)':<20} {train_precision:>19.4f} {test_precision:>19.4f} {abs(train_precision-test_precision):>9.4f}")
-    print(f"{'Recall (macro)':<20} {train_recall:>19.4f} {test_recall:>19.4f} {abs(train_recall-test_recall):>9.4f}")
-    print(f"{'ROC-AUC':<20} {train_auc:>19.4f} {test_auc:>19.4f} {abs(train_auc-test_auc):>9.4f}")
+    if train_scores is not None:
+        print(f"{'Metric':<20} {'Training':<20} {'Test':<20} {'Difference':<10}")
+        print("-"*70)
+        for label, train, test in zip(metric_labels, train_scores, test_scores):
+            print(f"{label:<20} {train:>19.4f} {test:>19.4f} {abs(train-test):>9.4f}")
+    else:
+        print(f"{'Metric':<20} {'Test':<20}")
+        print("-"*70)
+        for label, test in zip(metric_labels, test_scores):
+            print(f"{label:<20} {test:>19.4f}")
     print("="*70)
     
     # Check for overfitting
-    if train_f1 - test_f1 > 0.10:
+    if train_scores is None:
+        print("\n(Train metrics skipped: generalization gap not checked)")
+    elif train_f1 - test_f1 > 0.10:
         print("\n⚠️  WARNING: Potential overfitting detected (train-test F1 gap > 0.10)")
     else:
         print("\n✓ Good generalization (train-test F1 gap < 0.10)")
@@ -232,22 +340,36 @@ def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names):
     
     # Confusion matrix
     print("[Train] Confusion Matrix (Test Set):")
-    cm = confusion_matrix(y_test, y_test_pred)
     print(f"                Predicted Unfit  Predicted Fit")
     print(f"Actual Unfit    {cm[0,0]:>15}  {cm[0,1]:>13}")
     print(f"Actual Fit      {cm[1,0]:>15}  {cm[1,1]:>13}")
     
     # Feature importances (top 10)
-    print("\n[Train] Top 10 Feature Importances (Gini decrease):")
-    importances = model.feature_importances_
-    indices = np.argsort(importances)[::-1][:10]
+    # Boosted trees expose no impurity importances; use the mean drop in
+    # test f1_macro when each feature is shuffled. n_repeats=3: each repeat
+    # costs one predict_proba pass per feature, so keep it small
+    print("\n[Train] Top 10 Feature Importances (permutation, test f1_macro):")
+    importances = permutation_importance(
+        model, X_test, y_test, scoring='f1_macro', n_repeats=3,
+        random_state=RANDOM_STATE, n_jobs=-1
+    ).importances_mean
+    # Partial select top-10, then sort only those
+    k = min(10, importances.size)
+    indices = np.argpartition(-importances, k - 1)[:k]
+    indices = indices[np.argsort(-importances[indices], kind='stable')]
+    
+    # Importances are f1 drops, not shares; Percentage is each feature's share
+    # of the total positive drop. Negative drops (shuffling helped, i.e. noise)
+    # are clipped to 0 so shares stay within 0-100%
+    clipped = np.clip(importances, 0, None)
+    positive_total = clipped.sum()
     
     print(f"{'Rank':<6} {'Feature':<30} {'Importance':<12} {'Percentage'}")
     print("-"*70)
     for rank, idx in enumerate(indices, 1):
         feat_name = feature_names[idx] if idx < len(feature_names) else f"Feature_{idx}"
         importance = importances[idx]
-        percentage = importance * 100
+        percentage = clipped[idx] / positive_total * 100 if positive_total > 0 else 0.0
         print(f"{rank:<6} {feat_name:<30} {importance:>11.6f} {percentage:>10.2f}%")
     
     # Return metrics dictionary
@@ -258,7 +380,7 @@ def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names):
             'precision_macro': float(train_precision),
             'recall_macro': float(train_recall),
             'roc_auc': float(train_auc)
-        },
+        } if train_scores is not None else None,
         'test': {
             'accuracy': float(test_acc),
             'f1_macro': float(test_f1),
@@ -267,9 +389,10 @@ def evaluate_model(model, X_train, y_train, X_test, y_test, feature_names):
             'roc_auc': float(test_auc)
         },
         'confusion_matrix': cm.tolist(),
+        # Only features whose shuffling lowered f1 (importance > 0); zero and
+        # negative drops carry no signal and would skew shares computed from these
         'feature_importances': {
-            feature_names[i] if i < len(feature_names) else f"Feature_{i}": float(importances[i])
-            for i in range(len(importances))
+            feature_names[i]: float(importances[i]) for i in np.flatnonzero(importances > 0)
         }
     }
     
@@ -281,13 +404,14 @@ def train_model():
     
     Steps:
     1. Load preprocessed training and test data
-    2. Perform hyperparameter tuning via GridSearchCV
+    2. Perform hyperparameter tuning via HalvingGridSearchCV
     3. Train final model with best parameters
     4. Evaluate on train and test sets
     5. Save trained model and metrics
     
     Output:
-    - rf_model.pkl: Trained Random Forest model (for predict.py)
+    - rf_model.pkl: Trained gradient boosting model (for predict.py; file
+      name kept for the TypeScript backend)
     - training_metrics.json: Performance metrics (for documentation)
     """
     print("\n" + "="*70)
@@ -299,38 +423,43 @@ def train_model():
     
     # Step 2: Hyperparameter tuning
     best_model, best_params = perform_hyperparameter_tuning(X_train, y_train)
+    if EXTEND_TREES:
+        best_model = extend_model(best_model, X_train, y_train)
     
     # Step 3: Evaluate model
-    metrics = evaluate_model(best_model, X_train, y_train, X_test, y_test, feature_names)
+    metrics = evaluate_model(best_model, X_train, y_train, X_test, y_test, feature_names,
+                             compute_train_metrics=COMPUTE_TRAIN_METRICS)
     
     # Step 4: Save model
     print("\n[Train] Saving trained model...")
     model_path = ML_DIR / 'rf_model.pkl'
-    joblib.dump(best_model, model_path)
+    # Uncompressed, protocol 5: predict.py memory-maps the tree arrays on load
+    joblib.dump(best_model, model_path, compress=0, protocol=5)
     print(f"  - Saved model to {model_path}")
     
     # Step 5: Save metrics
     metrics_path = ML_DIR / 'training_metrics.json'
     training_info = {
-        'model': 'RandomForestClassifier',
+        'model': 'HistGradientBoostingClassifier',
         'best_params': best_params,
         'metrics': metrics,
         'feature_names': feature_names,
         'training_date': pd.Timestamp.now().isoformat()
     }
     
-    with open(metrics_path, 'w') as f:
-        json.dump(training_info, f, indent=2)
+    # Compact orjson output (NumPy scalars serialized natively)
+    with open(metrics_path, 'wb') as f:
+        f.write(orjson.dumps(training_info, option=orjson.OPT_SERIALIZE_NUMPY))
     print(f"  - Saved metrics to {metrics_path}")
     
     # Final summary
     print("\n" + "="*70)
     print("TRAINING COMPLETE!")
     print("="*70)
-    print(f"Model: Random Forest Classifier")
-    print(f"Best parameters: n_estimators={best_params['n_estimators']}, "
+    print(f"Model: Histogram Gradient Boosting Classifier")
+    print(f"Best parameters: max_iter={best_params['max_iter']}, "
           f"max_depth={best_params['max_depth']}, "
-          f"min_samples_split={best_params['min_samples_split']}")
+          f"learning_rate={best_params['learning_rate']}")
     print(f"Test F1-score (macro): {metrics['test']['f1_macro']:.4f}")
     print(f"Test ROC-AUC: {metrics['test']['roc_auc']:.4f}")
     